@@ -1,6 +1,6 @@
 ## Incremental placement module combining rule-based heuristic with a lightweight
 ## Q-learning (multi-armed bandit style) component for new incoming items.
-## Function: place_new_item(new_item: dict) -> str
+## Function: place_new_item(new_item: dict) -> dict with "message" and "location"
 ## ...existing code...
 from __future__ import annotations
 
@@ -224,111 +224,57 @@ def _reward(distance: float, max_distance: float, demand_frequency: float, *, vo
         return norm_dist_component + DEMAND_WEIGHT * demand_norm + FIT_WEIGHT * fit_score
 
 
-def place_new_item(new_item: dict) -> str:
+def place_new_item(new_item: dict) -> dict:
     # Place a new item using hybrid rule-based + Q-learning (bandit) approach.
     # Side-effect: appends placement to placement_recommendations.csv and updates Q table.
+    # Returns {"message": ..., "location": shelf id or None} so callers never
+    # have to parse the location back out of the message string.
     return _place_new_item_core(new_item)
 
 
-def _place_new_item_core(new_item: dict, layout_override: Optional[str] = None) -> str:
-    # Internal core with optional layout override (batch support).
-    required_keys = {"item_id", "demand_frequency", "dimensions", "current_stock", "weight_per_unit"}
-    missing = required_keys - set(new_item.keys())
-    if missing:
-        raise ValueError(f"new_item dict missing required keys: {missing}")
-
-    # Parse volume
-    volume = _parse_volume(new_item.get("dimensions"))
-    if volume is None or volume <= 0:
-        return f"No suitable location found for item {new_item['item_id']}"  # cannot place with invalid volume
-
-    total_weight = float(new_item["current_stock"]) * float(new_item["weight_per_unit"])
-    demand_freq = float(new_item["demand_frequency"])
-
-    # Load data
+def place_new_items(new_items: List[dict], layout_override: Optional[str] = None) -> List[dict]:
+    # Batch variant: load layout/placements/Q table once, place each item against
+    # the in-memory state, persist everything once at the end. Same per-item
+    # behavior as place_new_item but without per-item file I/O.
     layout_df = _load_layout(layout_override)
     placements_df = _load_existing_placements()
-    available_df = _get_available_shelves(layout_df, placements_df)
-    if available_df.empty:
-        return f"No suitable location found for item {new_item['item_id']}"
-
-    # Feasible subset
-    feasible_df = _feasible_shelves(available_df, volume, total_weight)
-    if feasible_df.empty:
-        return f"No suitable location found for item {new_item['item_id']}"
-
-    # Compute priority & sort for rule-based baseline
-    feasible_df = _compute_distances(feasible_df)
-    feasible_df = feasible_df.sort_values(by=["distance", "location_id"]).copy()
-
-    # RL training (bandit per state bucket)
     q_table = _load_q_table()
     meta = _load_meta()
-    current_epsilon = float(meta.get("epsilon", EPSILON_START))
-    steps = int(meta.get("steps", 0))
-    demand_bucket = _demand_bucket(demand_freq)
-    # Space bucket (pre-placement remaining ratio coarse buckets 0-4)
-    def space_bucket(rem_ratio: float) -> int:
-        if rem_ratio >= 0.8: return 4
-        if rem_ratio >= 0.6: return 3
-        if rem_ratio >= 0.4: return 2
-        if rem_ratio >= 0.2: return 1
-        return 0
-    # Diversity bucket: count of prior distinct items already on shelf (from placements_df)
-    diversity_map = {}
-    if not placements_df.empty:
-        placed_hist = placements_df[placements_df["recommended_location"].notna() & (placements_df["recommended_location"] != "UNPLACED")]
-        if not placed_hist.empty:
-            diversity_map = placed_hist.groupby("recommended_location")["item_id"].nunique().to_dict()
-    shelves = feasible_df["location_id"].tolist()
-    max_distance = feasible_df["distance"].max()
-
-    # Optimistic Q-value initialization for A19 shelves
-    for sid in shelves:
-        aisle = sid.split("-")[0] if "-" in sid else ""
-        if aisle == "A19" and (demand_bucket, sid) not in q_table:
-            q_table[(demand_bucket, sid)] = 1.0  # optimistic initial Q-value
-    for _ in range(N_EPISODES):
-        # Use mean remaining ratio across feasible shelves just for bucket derivation per action
-        # Epsilon-greedy uses a partial state (demand_bucket, generic space bucket  ) -> we approximate with average remaining ratio of chosen shelf each iteration
-        # We compute state per chosen shelf after selection for update.
-        # For selection, we approximate using median remaining ratio to build a stable partial key.
-        median_remaining_ratio = 0.0
-        if "remaining_size" in feasible_df.columns:
-            cap_series = feasible_df.apply(lambda r: float(r.get("remaining_size", r.get("max_size", 0.0))) / float(r.get("max_size", 1.0)), axis=1)
-            if not cap_series.empty:
-                median_remaining_ratio = float(cap_series.median())
-        space_bucket_partial = space_bucket(median_remaining_ratio)
-        diversity_bucket_partial = 0  # partial key diversity ignored for selection; refined per shelf update
-        state_key_partial = (demand_bucket, space_bucket_partial, diversity_bucket_partial)
-        action_shelf = _epsilon_greedy_select(q_table, state_key_partial, shelves, current_epsilon)
-        row_sel = feasible_df.loc[feasible_df.location_id == action_shelf].iloc[0]
-        dist = float(row_sel["distance"])
-        shelf_capacity = float(row_sel.get("max_size", 0.0))
-        remaining_before = float(row_sel.get("remaining_size", shelf_capacity))
-        rem_ratio = remaining_before / shelf_capacity if shelf_capacity > 0 else 0.0
-        sp_bucket = space_bucket(rem_ratio)
-        div_count = diversity_map.get(action_shelf, 0)
-        if div_count >= 8:
-            diversity_bucket = 4
-        elif div_count >= 5:
-            diversity_bucket = 3
-        elif div_count >= 3:
-            diversity_bucket = 2
-        elif div_count >= 1:
-            diversity_bucket = 1
-        else:
-            diversity_bucket = 0
-        r = _reward(dist, max_distance, demand_freq, volume=volume, shelf_capacity=shelf_capacity, remaining_before=remaining_before)
-        full_key = (demand_bucket, sp_bucket, diversity_bucket, action_shelf)
-        legacy_key = (demand_bucket, action_shelf)
-        old_q = q_table.get(full_key, q_table.get(legacy_key, 0.0))
-        new_q = (1 - ALPHA) * old_q + ALPHA * r
-        q_table[full_key] = new_q
-        # Update exploration schedule
-        steps += 1
-        current_epsilon = max(EPSILON_MIN, current_epsilon * EPSILON_DECAY)
+    results: List[dict] = []
+    placed_any = False
+    for new_item in new_items:
+        result, new_row = _place_item_with_state(new_item, layout_df, placements_df, q_table, meta)
+        if new_row is not None:
+            placements_df = pd.concat([placements_df, pd.DataFrame([new_row])], ignore_index=True)
+            placed_any = True
+        results.append(result)
+    if placed_any:
+        placements_df.to_csv(PLACEMENTS_FILE, index=False)
+        _save_q_table(q_table)
+        _save_meta(meta)
+    return results
+
+
+def _place_new_item_core(new_item: dict, layout_override: Optional[str] = None) -> dict:
     # Internal core with optional layout override (batch support).
+    layout_df = _load_layout(layout_override)
+    placements_df = _load_existing_placements()
+    q_table = _load_q_table()
+    meta = _load_meta()
+    result, new_row = _place_item_with_state(new_item, layout_df, placements_df, q_table, meta)
+    if new_row is not None:
+        # Persist placement, Q table and exploration schedule
+        placements_df = pd.concat([placements_df, pd.DataFrame([new_row])], ignore_index=True)
+        placements_df.to_csv(PLACEMENTS_FILE, index=False)
+        _save_q_table(q_table)
+        _save_meta(meta)
+    return result
+
+
+def _place_item_with_state(new_item: dict, layout_df: pd.DataFrame, placements_df: pd.DataFrame, q_table: Dict[Any, float], meta: Dict[str, Any]) -> Tuple[dict, Optional[dict]]:
+    # Per-item placement against already-loaded state. Mutates q_table and meta
+    # in place; returns ({"message", "location"}, new placement row or None).
+    # Persistence is the caller's responsibility so batch callers can amortize it.
     required_keys = {"item_id", "demand_frequency", "dimensions", "current_stock", "weight_per_unit"}
     missing = required_keys - set(new_item.keys())
     if missing:
@@ -337,30 +283,25 @@ def _place_new_item_core(new_item: dict, layout_override: Optional[str] = None)
     # Parse volume
     volume = _parse_volume(new_item.get("dimensions"))
     if volume is None or volume <= 0:
-        return f"No suitable location found for item {new_item['item_id']}"  # cannot place with invalid volume
+        return {"message": f"No suitable location found for item {new_item['item_id']}", "location": None}, None  # cannot place with invalid volume
 
     total_weight = float(new_item["current_stock"]) * float(new_item["weight_per_unit"])
     demand_freq = float(new_item["demand_frequency"])
 
-    # Load data
-    layout_df = _load_layout(layout_override)
-    placements_df = _load_existing_placements()
     available_df = _get_available_shelves(layout_df, placements_df)
     if available_df.empty:
-        return f"No suitable location found for item {new_item['item_id']}"
+        return {"message": f"No suitable location found for item {new_item['item_id']}", "location": None}, None
 
     # Feasible subset
     feasible_df = _feasible_shelves(available_df, volume, total_weight)
     if feasible_df.empty:
-        return f"No suitable location found for item {new_item['item_id']}"
+        return {"message": f"No suitable location found for item {new_item['item_id']}", "location": None}, None
 
     # Compute priority & sort for rule-based baseline
     feasible_df = _compute_distances(feasible_df)
     feasible_df = feasible_df.sort_values(by=["distance", "location_id"]).copy()
 
     # RL training (bandit per state bucket)
-    q_table = _load_q_table()
-    meta = _load_meta()
     current_epsilon = float(meta.get("epsilon", EPSILON_START))
     steps = int(meta.get("steps", 0))
     demand_bucket = _demand_bucket(demand_freq)
@@ -444,7 +385,6 @@ def _place_new_item_core(new_item: dict, layout_override: Optional[str] = None)
     if best_shelf is None:
         best_shelf = shelves[0]  # first feasible by distance
 
-    # Persist placement
     # Update residuals after selecting shelf
     # Recompute residual fields for chosen shelf (if dataset supports them)
     allocated_volume = volume
@@ -465,25 +405,14 @@ def _place_new_item_core(new_item: dict, layout_override: Optional[str] = None)
         "remaining_size": remaining_size,
         "remaining_weight": remaining_weight,
     }
-    placements_df = pd.concat([placements_df, pd.DataFrame([new_row])], ignore_index=True)
-    placements_df.to_csv(PLACEMENTS_FILE, index=False)
 
-    # Persist Q table
-    _save_q_table(q_table)
     meta["steps"] = steps
     meta["epsilon"] = current_epsilon
-    _save_meta(meta)
 
-    # Append epsilon info if meta present for transparency during CLI usage
-    eps_info = ""
-    if os.path.exists(META_PATH):
-        try:
-            with open(META_PATH, "r", encoding="utf-8") as f:
-                m = json.load(f)
-            eps_info = f" (epsilon={m.get('epsilon'):.4f}, steps={m.get('steps')})"
-        except Exception:
-            pass
-    return f"New item {new_item['item_id']} placed at location {best_shelf}{eps_info}"
+    # Append epsilon info for transparency during CLI usage
+    eps_info = f" (epsilon={current_epsilon:.4f}, steps={steps})"
+    message = f"New item {new_item['item_id']} placed at location {best_shelf}{eps_info}"
+    return {"message": message, "location": best_shelf}, new_row
 
 
 def _interactive_prompt() -> dict:
@@ -515,7 +444,7 @@ def _interactive_prompt() -> dict:
 
 def _demo():  # pragma: no cover
     sample_item = {"item_id": "ITEM_DEMO_001", "demand_frequency": 37, "dimensions": "0.3x0.3x0.4", "current_stock": 25, "weight_per_unit": 0.8}
-    print(place_new_item(sample_item))
+    print(place_new_item(sample_item)["message"])
 
 
 def main():  # pragma: no cover - CLI entry
@@ -545,18 +474,19 @@ def main():  # pragma: no cover - CLI entry
         if missing:
             print(f"[ERROR] Batch file missing columns: {missing}")
             return 1
-        results = []
-        for _, row in df_batch.iterrows():
-            new_item = {
+        new_items = [
+            {
                 "item_id": row["item_id"],
                 "demand_frequency": row["demand_frequency"],
                 "dimensions": row["dimensions"],
                 "current_stock": row["current_stock"],
                 "weight_per_unit": row["weight_per_unit"],
             }
-            res = _place_new_item_core(new_item, layout_override=args.layout)
-            results.append(res)
-            print(res)
+            for _, row in df_batch.iterrows()
+        ]
+        results = place_new_items(new_items, layout_override=args.layout)
+        for res in results:
+            print(res["message"])
         print(f"Processed {len(results)} new orders.")
         return 0
 
@@ -564,7 +494,7 @@ def main():  # pragma: no cover - CLI entry
     try:
         item = _interactive_prompt()
         result = _place_new_item_core(item, layout_override=args.layout)
-        print("\n" + result)
+        print("\n" + result["message"])
     except KeyboardInterrupt:
         print("\nCancelled.")
         return 1
@@ -29,18 +29,52 @@ Limitations:
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
+import csv
 import datetime as dt
+import hashlib
 import os
 from typing import List, Optional
 
 import numpy as np
 import pandas as pd
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to the plain-Python loop
+    def njit(*args, **kwargs):  # noqa: D103
+        def wrap(func):
+            return func
+        return wrap
+
 PLACEMENTS_FILE = "placement_recommendations.csv"
 LAYOUT_CANDIDATE_FILENAMES = ["locations_data_extended.csv", "warehouse_layout.csv", "locations_data.csv"]
 INVENTORY_FILE = "inventory_data.csv"
 METRICS_FILE = "metrics_history.csv"
 
+# Only the columns compute_kpis actually touches; anything else is parse cost for nothing.
+PLACEMENT_COLS = ["item_id", "recommended_location", "allocated_volume", "allocated_weight", "remaining_size", "remaining_weight"]
+LAYOUT_COLS = ["location_id", "x_coord", "y_coord", "max_size", "max_weight"]
+INVENTORY_COLS = ["item_id", "demand_frequency"]
+
+CACHE_DIR = ".cache"
+
+# KPI keys in file order; keep in sync with the dict compute_kpis returns.
+METRIC_FIELDNAMES = [
+    "timestamp",
+    "rows",
+    "placed_rows",
+    "avg_distance",
+    "weighted_distance",
+    "unplaced_rate",
+    "avg_cube_utilization",
+    "fragmentation_rate",
+    "total_allocated_volume",
+    "capacity_ratio",
+    "free_effective_capacity_ratio",
+    "placements_with_capacity_cols_ratio",
+]
+
 
 def _pick_layout(layout_override: Optional[str]) -> str:
     if layout_override:
@@ -53,88 +87,180 @@ def _pick_layout(layout_override: Optional[str]) -> str:
     raise FileNotFoundError("No layout file found.")
 
 
+def _read_csv_cols(path: str, wanted: List[str]) -> pd.DataFrame:
+    # Multi-threaded pyarrow parse, restricted to the columns we use. The pyarrow
+    # engine only accepts a list for usecols, so intersect with the header to stay
+    # tolerant of older/narrower files.
+    with open(path, "r", encoding="utf-8") as f:
+        header = f.readline().rstrip("\n").split(",")
+    usecols = [c for c in wanted if c in header]
+    return pd.read_csv(path, engine="pyarrow", usecols=usecols)
+
+
+def _load_layout_cached(path: str) -> pd.DataFrame:
+    # Layout files rarely change between runs; keep a typed parquet copy keyed on
+    # (path, mtime, size) so repeat runs skip the CSV parse. A stale key simply
+    # misses and the CSV is re-read and re-cached.
+    key = f"{path}:{os.path.getmtime(path)}:{os.path.getsize(path)}"
+    digest = hashlib.md5(key.encode("utf-8")).hexdigest()[:16]
+    cache_path = os.path.join(CACHE_DIR, f"layout_{digest}.parquet")
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception:  # noqa: BLE001
+            pass
+    df = _read_csv_cols(path, LAYOUT_COLS)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_parquet(cache_path, index=False)
+    except Exception:  # noqa: BLE001
+        pass  # cache is best-effort; never fail the report over it
+    return df
+
+
 def load_data(layout_override: Optional[str]) -> tuple[pd.DataFrame, pd.DataFrame, Optional[pd.DataFrame]]:
     if not os.path.exists(PLACEMENTS_FILE):
         raise FileNotFoundError("placement_recommendations.csv not found")
-    placements = pd.read_csv(PLACEMENTS_FILE)
     layout_path = _pick_layout(layout_override)
-    layout = pd.read_csv(layout_path)
-    inventory = None
-    if os.path.exists(INVENTORY_FILE):
-        try:
-            inventory = pd.read_csv(INVENTORY_FILE)
-        except Exception:  # noqa: BLE001
-            pass
+    # Load the three files concurrently; the pyarrow parse releases the GIL, so
+    # disk I/O and parsing overlap instead of running back-to-back.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as ex:
+        f_placements = ex.submit(_read_csv_cols, PLACEMENTS_FILE, PLACEMENT_COLS)
+        f_layout = ex.submit(_load_layout_cached, layout_path)
+        f_inventory = ex.submit(_read_csv_cols, INVENTORY_FILE, INVENTORY_COLS) if os.path.exists(INVENTORY_FILE) else None
+        placements = f_placements.result()
+        layout = f_layout.result()
+        inventory = None
+        if f_inventory is not None:
+            try:
+                inventory = f_inventory.result()
+            except Exception:  # noqa: BLE001
+                pass
     return placements, layout, inventory
 
 
+@njit(cache=True)
+def _reduce_kpis(codes, unplaced_code, dist, alloc_vol):
+    # Note: no fastmath here — it would let LLVM fold the x == x NaN checks away.
+    # One fused pass over the merged-row arrays instead of several pandas
+    # reductions: counts placed/unplaced rows and accumulates the NaN-aware
+    # distance mean and allocated-volume total. NaN is detected via x != x.
+    placed_count = 0
+    unplaced_count = 0
+    dist_sum = 0.0
+    dist_cnt = 0
+    alloc_sum = 0.0
+    for i in range(codes.size):
+        c = codes[i]
+        if c == unplaced_code:
+            unplaced_count += 1
+        elif c >= 0:
+            placed_count += 1
+            d = dist[i]
+            if d == d:
+                dist_sum += d
+                dist_cnt += 1
+            a = alloc_vol[i]
+            if a == a:
+                alloc_sum += a
+    return placed_count, unplaced_count, dist_sum, dist_cnt, alloc_sum
+
+
 def compute_kpis(placements: pd.DataFrame, layout: pd.DataFrame, inventory: Optional[pd.DataFrame]):
     now = dt.datetime.utcnow().isoformat()
-    # Distance join
+    # Distance join: only carry the columns the merge needs instead of copying the full layout.
+    layout_small = layout[["location_id", "max_size", "max_weight"]].copy()
     if {"x_coord", "y_coord"}.issubset(layout.columns):
-        layout = layout.copy()
-        layout["distance"] = np.sqrt(layout["x_coord"] ** 2 + layout["y_coord"] ** 2)
+        # np.hypot fuses square/sum/sqrt into one pass over the coord arrays.
+        layout_small["distance"] = np.hypot(layout["x_coord"].to_numpy(copy=False), layout["y_coord"].to_numpy(copy=False))
     else:
-        layout["distance"] = np.nan
+        layout_small["distance"] = np.nan
+
+    # Categorical keys: merge/groupby on integer codes instead of hashing Python strings.
+    # Categories must cover every observed placement value (historical rows can reference
+    # locations absent from the current layout) or those rows would be nulled out.
+    cats = pd.Index(layout_small["location_id"].astype(str).unique())
+    cats = cats.union(placements["recommended_location"].dropna().astype(str).unique()).union(["UNPLACED"])
+    placements["recommended_location"] = pd.Categorical(placements["recommended_location"], categories=cats)
+    layout_small["location_id"] = pd.Categorical(layout_small["location_id"], categories=cats)
 
     # Ensure columns
     for col in ["allocated_volume", "allocated_weight", "remaining_size", "remaining_weight"]:
         if col not in placements.columns:
             placements[col] = np.nan
 
-    merged = placements.merge(layout[["location_id", "distance", "max_size", "max_weight"]], left_on="recommended_location", right_on="location_id", how="left")
+    merged = placements.merge(layout_small, left_on="recommended_location", right_on="location_id", how="left")
 
-    # Placed subset (with a real location id)
-    placed = merged[(merged["recommended_location"].notna()) & (merged["recommended_location"] != "UNPLACED")]
+    # Placed subset (with a real location id): one fused boolean op on the
+    # categorical codes (NaN is code -1) instead of notna + comparison + and.
+    loc_codes = merged["recommended_location"].cat.codes.to_numpy()
+    unplaced_code = merged["recommended_location"].cat.categories.get_loc("UNPLACED")
+    placed_mask = (loc_codes >= 0) & (loc_codes != unplaced_code)
+    placed = merged.iloc[placed_mask]
 
-    avg_distance = placed["distance"].mean() if not placed.empty else np.nan
-    unplaced_rate = (merged["recommended_location"] == "UNPLACED").mean() if not merged.empty else np.nan
+    # Materialize each numeric column once; every later reduction works on
+    # these contiguous float64 buffers instead of re-pulling the Series.
+    dist_arr = merged["distance"].to_numpy(dtype=np.float64)
+    alloc_vol = merged["allocated_volume"].to_numpy(dtype=np.float64)
+    alloc_vol_plc = placements["allocated_volume"].to_numpy(dtype=np.float64)
+    rem_plc = placements["remaining_size"].to_numpy(dtype=np.float64)
+    placed_count, unplaced_count, dist_sum, dist_cnt, alloc_sum = _reduce_kpis(
+        loc_codes, unplaced_code, dist_arr, alloc_vol
+    )
+    avg_distance = dist_sum / dist_cnt if dist_cnt else np.nan
+    unplaced_rate = unplaced_count / len(merged) if not merged.empty else np.nan
 
-    # Shelf utilization (aggregate allocated volume by location)
-    alloc_rows = placed[placed["allocated_volume"].notna()]
-    shelf_util = None
+    # Shelf utilization (aggregate allocated volume by location). max_size is a
+    # per-location constant from the layout, so look it up via a dict instead of
+    # dragging it through the groupby with a "first" agg.
+    alloc_rows = placed.iloc[~np.isnan(alloc_vol[placed_mask])]
     avg_cube_util = np.nan
     fragmentation_rate = np.nan
-    total_allocated_volume = float(alloc_rows["allocated_volume"].sum()) if not alloc_rows.empty else 0.0
+    total_allocated_volume = float(alloc_sum)
     if not alloc_rows.empty:
-        shelf_util = alloc_rows.groupby("recommended_location").agg({
-            "allocated_volume": "sum",
-            "max_size": "first"
-        })
-        shelf_util["utilization"] = shelf_util["allocated_volume"] / shelf_util["max_size"].replace(0, np.nan)
-        avg_cube_util = shelf_util["utilization"].mean()
-        fragmentation_rate = (shelf_util[(shelf_util["utilization"] > 0) & (shelf_util["utilization"] < 0.1)].shape[0] / shelf_util.shape[0]) if shelf_util.shape[0] else np.nan
-
-    total_capacity = float(layout["max_size"].sum()) if "max_size" in layout.columns else np.nan
+        vol = alloc_rows.groupby("recommended_location", sort=False, observed=True)["allocated_volume"].sum()
+        size_map = dict(zip(layout_small["location_id"], layout_small["max_size"]))
+        max_size_arr = vol.index.map(size_map).to_numpy(dtype=np.float64)
+        util = vol.to_numpy() / np.where(max_size_arr == 0, np.nan, max_size_arr)
+        valid_util = util[~np.isnan(util)]
+        avg_cube_util = float(valid_util.mean()) if valid_util.size else np.nan
+        fragmentation_rate = np.count_nonzero((util > 0) & (util < 0.1)) / util.size if util.size else np.nan
+
+    total_capacity = float(layout["max_size"].to_numpy().sum()) if "max_size" in layout.columns else np.nan
     capacity_ratio = (total_allocated_volume / total_capacity) if total_capacity and total_capacity > 0 else np.nan
 
-    # Effective free capacity (approx): use latest remaining_size per location (last occurrence in placements)
-    latest = placements.copy()
-    if "remaining_size" in latest.columns:
-        latest = latest[latest["remaining_size"].notna()].copy()
-        latest = latest.sort_index()  # ensure order
-        latest_last = latest.groupby("recommended_location").tail(1)
-        free_effective_capacity_ratio = latest_last["remaining_size"].sum() / total_capacity if total_capacity and total_capacity > 0 and not latest_last.empty else np.nan
+    # Effective free capacity (approx): use latest remaining_size per location (last occurrence in placements).
+    # drop_duplicates(keep="last") is a single linear pass vs sort_index + groupby().tail(1).
+    if "remaining_size" in placements.columns:
+        # Exclude rows with no location (code -1): groupby dropped NaN keys, so
+        # drop_duplicates must not keep them either.
+        residual_mask = ~np.isnan(rem_plc) & (placements["recommended_location"].cat.codes.to_numpy() >= 0)
+        latest_last = placements.loc[
+            residual_mask, ["recommended_location", "remaining_size"]
+        ].drop_duplicates(subset="recommended_location", keep="last")
+        free_effective_capacity_ratio = latest_last["remaining_size"].to_numpy().sum() / total_capacity if total_capacity and total_capacity > 0 and not latest_last.empty else np.nan
     else:
         free_effective_capacity_ratio = np.nan
 
-    placements_with_capacity_cols_ratio = (placements["allocated_volume"].notna().mean()) if not placements.empty else np.nan
+    placements_with_capacity_cols_ratio = np.count_nonzero(~np.isnan(alloc_vol_plc)) / len(alloc_vol_plc) if len(alloc_vol_plc) else np.nan
 
-    # Weighted distance (if inventory provides demand_frequency)
+    # Weighted distance (if inventory provides demand_frequency). A dict map is
+    # all we need for a per-row frequency lookup; no merge machinery.
     weighted_distance = np.nan
     if inventory is not None and "demand_frequency" in inventory.columns:
-        placed_inv = placed.merge(inventory[["item_id", "demand_frequency"]], on="item_id", how="left")
-        placed_inv = placed_inv[placed_inv["demand_frequency"].notna()]
-        if not placed_inv.empty:
-            num = (placed_inv["distance"] * placed_inv["demand_frequency"]).sum()
-            den = placed_inv["demand_frequency"].sum()
+        freq_map = dict(zip(inventory["item_id"].to_numpy(), inventory["demand_frequency"].to_numpy()))
+        freq = placed["item_id"].map(freq_map).to_numpy(dtype=np.float64)
+        freq_mask = ~np.isnan(freq)
+        if freq_mask.any():
+            num = np.nansum(dist_arr[placed_mask][freq_mask] * freq[freq_mask])
+            den = freq[freq_mask].sum()
             if den > 0:
                 weighted_distance = num / den
 
     return {
         "timestamp": now,
         "rows": int(len(placements)),
-        "placed_rows": int(len(placed)),
+        "placed_rows": int(placed_count),
         "avg_distance": avg_distance,
         "weighted_distance": weighted_distance,
         "unplaced_rate": unplaced_rate,
@@ -148,13 +274,15 @@ def compute_kpis(placements: pd.DataFrame, layout: pd.DataFrame, inventory: Opti
 
 
 def append_metrics(row: dict):
-    df_row = pd.DataFrame([row])
-    if os.path.exists(METRICS_FILE):
-        existing = pd.read_csv(METRICS_FILE)
-        combined = pd.concat([existing, df_row], ignore_index=True)
-        combined.to_csv(METRICS_FILE, index=False)
-    else:
-        df_row.to_csv(METRICS_FILE, index=False)
+    # Append-only write with no pandas involved: one header on first run, then
+    # one csv row per call. NaN is written as an empty field, matching what
+    # to_csv produced historically.
+    new_file = not os.path.exists(METRICS_FILE)
+    with open(METRICS_FILE, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(METRIC_FIELDNAMES)
+        writer.writerow(["" if isinstance(v, float) and v != v else v for v in (row[k] for k in METRIC_FIELDNAMES)])
 
 
 def main():  # pragma: no cover
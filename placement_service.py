@@ -1,49 +1,125 @@
-from flask import Flask, request, jsonify
-from incremental_placement import place_new_item
+import asyncio
+import logging
+import os
+
+import orjson
+from quart import Quart, request
+from incremental_placement import place_new_items
+
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+logger = logging.getLogger(__name__)
+
+app = Quart(__name__)
+
+
+def ojsonify(obj, status: int = 200):
+    # orjson is a C extension with SIMD number formatting; much faster than the
+    # stdlib json that jsonify goes through.
+    return app.response_class(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+def _placement_result(result: dict) -> dict:
+    # place_new_items returns {"message", "location"}; no string parsing needed.
+    return {
+        "message": result["message"],
+        "recommended_location": result["location"]
+    }
 
-app = Flask(__name__)
 
 @app.route("/place-item", methods=["POST"])
-def place_item():
-    data = request.get_json()
-    print("DEBUG - microservice received:", data)
+async def place_item():
+    try:
+        data = orjson.loads(await request.get_data())
+    except orjson.JSONDecodeError:
+        return ojsonify({"error": "Invalid JSON body"}, status=400)
+    # isEnabledFor short-circuits the formatting when DEBUG is off, so this is
+    # free on the hot path in production.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("microservice received: %s", data)
 
     item = parse_new_item(data)
     if "error" in item:
-        return jsonify(item), 400
-    
-    # Call your existing place_new_item function
+        return ojsonify(item, status=400)
+
+    # place_new_items does blocking CSV/pickle I/O, so run it in a worker thread
+    # and keep the event loop free for other in-flight requests.
     try:
-        message = place_new_item(item)
-        # Extract location from message
-        location = None
-        if "placed at location" in message:
-            location = message.split("placed at location")[-1].strip()
-        return jsonify({
-            "message": message,
-            "recommended_location": location
-        })
+        results = await asyncio.to_thread(place_new_items, [item])
+        return ojsonify(_placement_result(results[0]))
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
-def parse_new_item(data: dict) -> dict:
-    """Ensure all required fields exist and are correctly typed."""
+        return ojsonify({"error": str(e)}, status=500)
+
+
+@app.route("/place-items", methods=["POST"])
+async def place_items():
+    # Batch endpoint: one layout/placements/Q-table load shared across all items
+    # instead of per-request setup.
+    try:
+        data = orjson.loads(await request.get_data())
+    except orjson.JSONDecodeError:
+        return ojsonify({"error": "Invalid JSON body"}, status=400)
+    if not isinstance(data, list):
+        return ojsonify({"error": "Expected a JSON array of items"}, status=400)
+
+    items = []
+    for entry in data:
+        item = parse_new_item(entry)
+        if "error" in item:
+            return ojsonify(item, status=400)
+        items.append(item)
+
     try:
-        item_id = str(data["item_id"])
-        demand_frequency = int(data.get("demand_frequency") or 0)
-        current_stock = int(data.get("current_stock") or 0)
-        weight_per_unit = float(data.get("weight_per_unit") or 1.0)
-        dimensions = str(data.get("dimensions") or "1x1x1")
-        return {
-            "item_id": item_id,
-            "demand_frequency": demand_frequency,
-            "current_stock": current_stock,
-            "weight_per_unit": weight_per_unit,
-            "dimensions": dimensions
-        }
-    except KeyError as e:
-        return {"error": f"Missing required key: {e}"}
+        results = await asyncio.to_thread(place_new_items, items)
+        return ojsonify([_placement_result(r) for r in results])
     except Exception as e:
-        return {"error": str(e)}
+        return ojsonify({"error": str(e)}, status=500)
+# (key, caster, default); a None default marks the field as required. Explicit
+# None/empty checks instead of `.get(k) or default`, which silently replaced
+# valid falsy values like 0.
+_ITEM_FIELDS = (
+    ("item_id", str, None),
+    ("demand_frequency", int, 0),
+    ("current_stock", int, 0),
+    ("weight_per_unit", float, 1.0),
+    ("dimensions", str, "1x1x1"),
+)
+
+
+def parse_new_item(data: dict) -> dict:
+    """Ensure all required fields exist and are correctly typed."""
+    # Bodies can decode to any JSON value; anything but an object is invalid.
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object"}
+    item = {}
+    for key, caster, default in _ITEM_FIELDS:
+        value = data.get(key)
+        if value is None or value == "":
+            if default is None:
+                return {"error": f"Missing required key: '{key}'"}
+            value = default
+        try:
+            item[key] = caster(value)
+        except (TypeError, ValueError) as e:
+            return {"error": f"Invalid value for '{key}': {e}"}
+    return item
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=6000, debug=True)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Placement microservice")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=6000)
+    parser.add_argument("--debug", action="store_true", help="Run the dev server with reloader (local dev only)")
+    args = parser.parse_args()
+
+    if args.debug:
+        app.run(host=args.host, port=args.port, debug=True)
+    else:
+        # Production path: ASGI server with an async event loop.
+        # Equivalent: hypercorn placement_service:app -b 0.0.0.0:6000 -w 4
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        config = Config()
+        config.bind = [f"{args.host}:{args.port}"]
+        asyncio.run(serve(app, config))